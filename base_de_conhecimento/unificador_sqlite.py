@@ -2,13 +2,17 @@ import pandas as pd
 import sqlite3
 import os
 from unidecode import unidecode
+from pathlib import Path
 
 # --- 1. CONFIGURAÇÕES ---
-# Nome do arquivo do banco de dados (deve estar na mesma pasta)
-NOME_BANCO_DE_DADOS = 'contaflow.db'
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
+
+# Banco de dados central, na raiz do projeto (o mesmo que o migrador cria)
+NOME_BANCO_DE_DADOS = REPO_ROOT / 'contaflow.db'
 
 # Nome do arquivo do novo cliente que queremos "aprender"
-ARQUIVO_NOVO_CLIENTE = r'C:\Users\rodri\Documents\PROGRAMAÇÃO\PYTHON\projeto_classificacao_financeira\Base de dados\arquivo_para_classificar\plano_de_contas_pcpl.csv'
+ARQUIVO_NOVO_CLIENTE = BASE_DIR / 'plano_de_contas_pcpl.csv'
 
 
 def ler_csv_com_fallback(caminho_arquivo):
@@ -31,7 +35,7 @@ def normalizar_texto(texto):
     return unidecode(texto).lower().strip()
 
 
-def unificar_planos_no_db():
+def unificar_planos_no_db(arquivo_novo_cliente=ARQUIVO_NOVO_CLIENTE, caminho_banco_de_dados=NOME_BANCO_DE_DADOS):
     """
     Lê o plano de contas de um cliente e adiciona novas contas válidas
     diretamente no banco de dados SQLite.
@@ -40,7 +44,7 @@ def unificar_planos_no_db():
 
     try:
         # --- Conexão com o Banco de Dados ---
-        conexao = sqlite3.connect(NOME_BANCO_DE_DADOS)
+        conexao = sqlite3.connect(caminho_banco_de_dados)
 
         # --- Carregar o Plano de Contas Mestre do Banco de Dados ---
         # A cláusula 'try-except' lida com o caso de a tabela ainda não existir
@@ -52,7 +56,7 @@ def unificar_planos_no_db():
             df_mestre = pd.DataFrame(columns=['codigo', 'grupo', 'subgrupo', 'movimentacao'])
 
         # --- Carregar o Plano de Contas do Novo Cliente ---
-        df_cliente = ler_csv_com_fallback(ARQUIVO_NOVO_CLIENTE)
+        df_cliente = ler_csv_com_fallback(arquivo_novo_cliente)
         print(f" -> Plano de Contas do Cliente carregado com {len(df_cliente)} contas.")
 
     except Exception as e:
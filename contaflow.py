@@ -0,0 +1,87 @@
+import time
+
+# Marca o início antes de qualquer outro import para medir a inicialização inteira
+INICIO = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+# --- 1. CONFIGURAÇÕES ---
+REPO_ROOT = Path(__file__).resolve().parent
+
+# Banco central, independente do diretório de onde a CLI é chamada
+CAMINHO_BANCO_DE_DADOS = REPO_ROOT / 'contaflow.db'
+PASTA_BASE_DE_CONHECIMENTO = REPO_ROOT / 'base_de_conhecimento'
+
+# Subcomando -> (pasta do script, módulo, função principal)
+# Os módulos só são importados quando o subcomando é escolhido: pandas, joblib e
+# scikit-learn não pesam no '--help' nem nos subcomandos que não precisam deles.
+SUBCOMANDOS = {
+    'migrar': ('gerenciamento_db', 'migrador_csv_para_sqlite', 'migrar_csv_para_sqlite'),
+    'unificar': ('base_de_conhecimento', 'unificador_sqlite', 'unificar_planos_no_db'),
+    'treinar': ('modelo_ia', 'treinador_sqlite', 'treinar_modelo_com_db'),
+    'classificar': ('modelo_ia', 'classificador_sqlite', 'classificar_com_db'),
+    'avaliar': ('modelo_ia', 'avaliador_sqlite', 'avaliar_modelo_com_db'),
+}
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog='contaflow',
+        description='ContaFlow: migração, unificação, treinamento, classificação e avaliação.'
+    )
+    subparsers = parser.add_subparsers(dest='subcomando', required=True)
+
+    migrar = subparsers.add_parser('migrar', help='Cria/recarrega o contaflow.db a partir dos CSVs.')
+    migrar.add_argument('--plano', dest='arquivo_plano_mestre',
+                        default=PASTA_BASE_DE_CONHECIMENTO / 'plano_de_contas_mestre.csv',
+                        help='CSV do plano de contas mestre (padrão: %(default)s).')
+    migrar.add_argument('--treinamento', dest='arquivo_treinamento_ia',
+                        default=PASTA_BASE_DE_CONHECIMENTO / 'base_de_treinamento_ia.csv',
+                        help='CSV da base de treinamento da IA (padrão: %(default)s).')
+    migrar.set_defaults(caminho_banco_de_dados=CAMINHO_BANCO_DE_DADOS)
+
+    unificar = subparsers.add_parser('unificar', help='Adiciona ao banco as contas novas do plano de um cliente.')
+    unificar.add_argument('arquivo_novo_cliente', nargs='?', help='CSV do plano de contas do cliente.')
+    unificar.set_defaults(caminho_banco_de_dados=CAMINHO_BANCO_DE_DADOS)
+
+    subparsers.add_parser('treinar', help='Treina o modelo de IA com os dados do banco.')
+
+    classificar = subparsers.add_parser('classificar', help='Classifica um fluxo de caixa de cliente.')
+    classificar.add_argument('arquivo_entrada_nome', nargs='?',
+                             help="Nome do arquivo dentro de 'arquivos_para_classificar'.")
+
+    subparsers.add_parser('avaliar', help='Calcula métricas do modelo e salva um snapshot no banco.')
+    return parser
+
+
+def carregar_funcao(subcomando):
+    """Importa o script do subcomando sob demanda e devolve sua função principal."""
+    pasta, modulo, funcao = SUBCOMANDOS[subcomando]
+    sys.path.insert(0, str(REPO_ROOT / pasta))
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+def main(argv=None):
+    argumentos = criar_parser().parse_args(argv)
+    # Só repassa os argumentos informados; os demais ficam com o padrão de cada script
+    opcoes = {chave: valor for chave, valor in vars(argumentos).items()
+              if chave != 'subcomando' and valor is not None}
+
+    inicio_import = time.perf_counter()
+    funcao_principal = carregar_funcao(argumentos.subcomando)
+    inicio_execucao = time.perf_counter()
+
+    funcao_principal(**opcoes)
+    fim = time.perf_counter()
+
+    print(f"\n⏱ Inicialização: {inicio_import - INICIO:.3f}s | "
+          f"importação do '{argumentos.subcomando}': {inicio_execucao - inicio_import:.3f}s | "
+          f"execução: {fim - inicio_execucao:.3f}s "
+          f"(scikit-learn carregado: {'sim' if 'sklearn' in sys.modules else 'não'})")
+
+
+if __name__ == "__main__":
+    main()
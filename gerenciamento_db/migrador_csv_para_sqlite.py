@@ -1,73 +1,201 @@
 import pandas as pd
 import sqlite3
 import os
+import time
+from pathlib import Path
 
 # --- 1. CONFIGURAÇÕES ---
-# Nomes dos arquivos de entrada (de onde vamos ler os dados)
-ARQUIVO_PLANO_MESTRE = r'C:\Users\rodri\Documents\PROGRAMAÇÃO\PYTHON\projeto_classificacao_financeira\Base de dados\base_de_conhecimento\plano_de_contas_mestre.csv'
-ARQUIVO_TREINAMENTO_IA = r'C:\Users\rodri\Documents\PROGRAMAÇÃO\PYTHON\projeto_classificacao_financeira\Base de dados\modelo_ia\base_de_treinamento_ia.csv'
-
-# Nome do arquivo do banco de dados que será criado
-NOME_BANCO_DE_DADOS = 'contaflow.db'
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
 
-def ler_csv_com_fallback(caminho_arquivo):
-    """Lê um CSV tentando diferentes codificações e separadores."""
-    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
+# Nomes dos arquivos de entrada (de onde vamos ler os dados)
+ARQUIVO_PLANO_MESTRE = REPO_ROOT / 'base_de_conhecimento' / 'plano_de_contas_mestre.csv'
+ARQUIVO_TREINAMENTO_IA = REPO_ROOT / 'base_de_conhecimento' / 'base_de_treinamento_ia.csv'
+
+# Banco de dados que será criado: o mesmo que treinador, classificador e avaliador leem
+NOME_BANCO_DE_DADOS = REPO_ROOT / 'contaflow.db'
+
+# Regras iniciais da tabela 'regras_padrao': (padrao, tipo, codigo, prioridade, ativo)
+# Ambos os tipos são testados na descrição normalizada (sem acentos, minúscula, espaços repetidos reduzidos a um):
+# 'palavra' casa a expressão inteira; 'regex' usa o padrão como está.
+# Quanto maior a prioridade, antes a regra é testada. Edite a tabela para ajustar ao seu plano.
+# Regras resolvem com confiança 1.0, então só vêm ativas as de código inequívoco neste plano.
+# As demais vêm com ativo = 0: revise o código antes de ativá-las.
+REGRAS_PADRAO_INICIAIS = [
+    (r'\btarifas?\b', 'regex', 369, 100, 1),  # Tarifas bancárias
+    ('folha', 'palavra', 187, 100, 1),  # 187 reúne apenas contas de salários e encargos
+    ('pix recebido', 'palavra', 11, 200, 0),  # 11 é compartilhado entre Banco Entrada e Banco Saída
+    ('iof', 'palavra', 369, 150, 0),  # não há conta própria de IOF no plano mestre
+    ('darf', 'palavra', 683, 150, 0),  # DARF paga vários tributos federais, não só IRPJ
+]
+
+# Configuração de cada tabela carregada a partir de CSV
+# 'renomear' ajusta os nomes de colunas do CSV para o padrão do banco; 'indices' são garantidos após a troca
+# (os demais índices que já existiam na tabela antiga são recriados a partir do sqlite_master)
+TABELAS_CARGA = {
+    'plano_de_contas': {
+        'renomear': {},
+        'indices': {'idx_plano_subgrupo': 'subgrupo', 'idx_plano_codigo': 'codigo'},
+    },
+    'base_de_treinamento': {
+        'renomear': {'descricaoexemplo': 'descricao', 'codigocorreto': 'codigo_correto'},
+        'indices': {'idx_treinamento_codigo': 'codigo_correto'},
+    },
+}
+
+# Linhas lidas do CSV e inseridas por lote
+TAMANHO_LOTE = 50_000
+
+# Codificações tentadas, em ordem; cada uma é validada no arquivo inteiro durante a carga
+ENCODINGS_CSV = ['utf-8-sig', 'latin-1', 'cp1252']
+
+# Ajustes do SQLite para a carga em massa.
+# WAL mantém os leitores enxergando as tabelas antigas até o COMMIT da troca;
+# o journal_mode anterior é restaurado ao final, já que ele fica gravado no arquivo.
+PRAGMAS_CARGA = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",  # ~256 MB de cache de páginas durante a carga
+]
+
+
+def detectar_separador_csv(caminho_arquivo, encoding):
+    """Descobre o separador lendo só o começo do arquivo; None se a amostra não decodificar."""
     separators = [';', ',', '\t'] # Adiciona TAB como um separador possível
-    for enc in encodings:
-        for sep in separators:
-            try:
-                df = pd.read_csv(caminho_arquivo, sep=sep, engine='python', encoding=enc)
-                if df.shape[1] > 1:
-                    print(f" -> Arquivo '{os.path.basename(caminho_arquivo)}' lido com sucesso.")
-                    return df
-            except Exception:
-                continue
+    for sep in separators:
+        try:
+            amostra = pd.read_csv(caminho_arquivo, sep=sep, encoding=encoding, nrows=1000)
+            if amostra.shape[1] > 1:
+                return sep
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            continue
+    return None
+
+
+def tipo_sqlite(dtype):
+    """Mapeia o dtype inferido pelo pandas para o tipo da coluna no SQLite."""
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def carregar_csv_em_staging(cursor, tabela, caminho_arquivo, config):
+    """
+    Carrega o CSV na tabela de staging '<tabela>__carga', tentando cada codificação.
+    A amostra inicial pode decodificar e o arquivo falhar mais adiante; nesse caso a
+    staging é descartada e a carga recomeça com a próxima codificação.
+    Retorna a quantidade de linhas carregadas.
+    """
+    for encoding in ENCODINGS_CSV:
+        sep = detectar_separador_csv(caminho_arquivo, encoding)
+        if sep is None:
+            continue
+        try:
+            total_linhas = inserir_lotes_em_staging(cursor, tabela, caminho_arquivo, encoding, sep, config)
+        except UnicodeDecodeError:
+            print(f"Aviso: '{os.path.basename(caminho_arquivo)}' não é {encoding} por inteiro; "
+                  "recarregando com a próxima codificação.")
+            continue
+        print(f" -> Arquivo '{os.path.basename(caminho_arquivo)}' carregado em staging "
+              f"({total_linhas} linhas, {encoding}).")
+        return total_linhas
     raise ValueError(f"Não foi possível ler ou decodificar o arquivo '{caminho_arquivo}'.")
 
-def migrar_csv_para_sqlite():
+
+def inserir_lotes_em_staging(cursor, tabela, caminho_arquivo, encoding, sep, config):
+    """Lê o CSV em lotes (engine C) e insere cada lote na tabela de staging, recriada do zero."""
+    tabela_staging = f"{tabela}__carga"
+    cursor.execute(f'DROP TABLE IF EXISTS "{tabela_staging}"')
+
+    total_linhas = 0
+    insert = None
+    for lote in pd.read_csv(caminho_arquivo, sep=sep, encoding=encoding, chunksize=TAMANHO_LOTE):
+        # Padroniza os nomes das colunas para garantir consistência no banco de dados
+        lote.columns = [col.strip().lower() for col in lote.columns]
+        lote.rename(columns=config['renomear'], inplace=True)
+
+        if insert is None:
+            colunas_sql = ', '.join(f'"{col}" {tipo_sqlite(dtype)}' for col, dtype in lote.dtypes.items())
+            cursor.execute(f'CREATE TABLE "{tabela_staging}" ({colunas_sql})')
+            colunas = list(lote.columns)
+            nomes_colunas = ', '.join(f'"{col}"' for col in colunas)
+            marcadores = ', '.join('?' for _ in colunas)
+            insert = f'INSERT INTO "{tabela_staging}" ({nomes_colunas}) VALUES ({marcadores})'
+
+        # astype(object) entrega int/float nativos do Python (numpy.int64 viraria BLOB no SQLite)
+        valores = lote[colunas].astype(object).where(lote[colunas].notna(), None)
+        cursor.executemany(insert, valores.itertuples(index=False, name=None))
+        total_linhas += len(lote)
+
+    if insert is None:
+        raise ValueError(f"O arquivo '{caminho_arquivo}' não contém dados.")
+    return total_linhas
+
+
+def trocar_staging_por_tabela(cursor, tabela, config):
+    """Substitui a tabela definitiva pela de staging e recria os índices (dentro da transação aberta)."""
+    # Guarda os índices da tabela antiga antes do DROP, que os descarta junto
+    indices_existentes = cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (tabela,)
+    ).fetchall()
+
+    cursor.execute(f'DROP TABLE IF EXISTS "{tabela}"')
+    cursor.execute(f'ALTER TABLE "{tabela}__carga" RENAME TO "{tabela}"')
+    for nome_indice, sql_indice in indices_existentes:
+        try:
+            cursor.execute(sql_indice)
+        except sqlite3.OperationalError as e:
+            print(f"Aviso: Índice '{nome_indice}' não pôde ser recriado em '{tabela}': {e}")
+    for nome_indice, coluna in config['indices'].items():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS "{nome_indice}" ON "{tabela}" ("{coluna}")')
+
+
+def migrar_csv_para_sqlite(arquivo_plano_mestre=ARQUIVO_PLANO_MESTRE, arquivo_treinamento_ia=ARQUIVO_TREINAMENTO_IA,
+                           caminho_banco_de_dados=NOME_BANCO_DE_DADOS):
     """
     Lê os arquivos CSV principais e os migra para um banco de dados SQLite.
-    Este script deve ser rodado apenas uma vez para criar a base.
+    A carga é feita em tabelas de staging e trocada de uma vez em uma única transação,
+    então o script pode ser rodado de novo sem que leitores vejam tabelas pela metade.
     """
     print("--- INICIANDO MIGRAÇÃO DE CSV PARA BANCO DE DADOS SQLITE ---")
+    arquivos = {'plano_de_contas': arquivo_plano_mestre, 'base_de_treinamento': arquivo_treinamento_ia}
 
+    # --- Conexão com o Banco de Dados ---
     try:
-        # Carrega os dados dos arquivos CSV
-        df_plano_mestre = ler_csv_com_fallback(ARQUIVO_PLANO_MESTRE)
-        df_treinamento = ler_csv_com_fallback(ARQUIVO_TREINAMENTO_IA)
-
-        # Padroniza os nomes das colunas para garantir consistência no banco de dados
-        df_plano_mestre.columns = [col.strip().lower() for col in df_plano_mestre.columns]
-        df_treinamento.columns = [col.strip().lower() for col in df_treinamento.columns]
-
-        # Renomeia colunas específicas para o padrão do banco de dados
-        df_plano_mestre.rename(columns={'movimentacao': 'movimentacao'}, inplace=True) # Exemplo, caso precise
-        df_treinamento.rename(columns={'descricaoexemplo': 'descricao', 'codigocorreto': 'codigo_correto'}, inplace=True)
-
-    except (FileNotFoundError, ValueError) as e:
-        print(f"ERRO CRÍTICO ao ler arquivos CSV: {e}")
+        # isolation_level=None: a transação é controlada explicitamente com BEGIN/COMMIT abaixo
+        conexao = sqlite3.connect(caminho_banco_de_dados, isolation_level=None)
+        print(f" -> Conexão com o banco de dados '{caminho_banco_de_dados}' estabelecida.")
+        journal_mode_anterior = conexao.execute("PRAGMA journal_mode").fetchone()[0]
+        for pragma in PRAGMAS_CARGA:
+            conexao.execute(pragma)
+    except sqlite3.Error as e:
+        print(f"ERRO CRÍTICO ao abrir o banco de dados: {e}")
         return
 
-    # --- Conexão com o Banco de Dados ---
-    # O arquivo .db será criado na mesma pasta onde o script for executado
-    try:
-        conexao = sqlite3.connect(NOME_BANCO_DE_DADOS)
-        print(f" -> Conexão com o banco de dados '{NOME_BANCO_DE_DADOS}' estabelecida.")
+    cursor = conexao.cursor()
+    inicio = time.perf_counter()
+    linhas_por_tabela = {}
+    bytes_lidos = 0
 
-        # --- Inserindo os Dados ---
-        # Usa o método to_sql do pandas para criar as tabelas e inserir os dados
-        # 'if_exists='replace'' significa que se você rodar o script de novo, ele apagará a tabela antiga e criará uma nova.
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
 
-        print(" -> Migrando Plano de Contas Mestre...")
-        df_plano_mestre.to_sql('plano_de_contas', conexao, if_exists='replace', index=False)
+        # --- Carga em staging ---
+        for tabela, config in TABELAS_CARGA.items():
+            print(f" -> Carregando '{tabela}'...")
+            linhas_por_tabela[tabela] = carregar_csv_em_staging(cursor, tabela, arquivos[tabela], config)
+            bytes_lidos += os.path.getsize(arquivos[tabela])
 
-        print(" -> Migrando Base de Treinamento da IA...")
-        df_treinamento.to_sql('base_de_treinamento', conexao, if_exists='replace', index=False)
+        # --- Troca atômica: só fica visível para os leitores no COMMIT ---
+        for tabela, config in TABELAS_CARGA.items():
+            trocar_staging_por_tabela(cursor, tabela, config)
 
         # Adicional: Criando a tabela para futuras transações
         print(" -> Criando tabela 'transacoes_classificadas' para o futuro...")
-        cursor = conexao.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transacoes_classificadas (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -78,19 +206,50 @@ def migrar_csv_para_sqlite():
                 metodo TEXT,
                 confianca REAL,
                 status TEXT DEFAULT 'para_verificar',
+                codigo_correto INTEGER,
                 data_processamento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
 
-        # Fecha a conexão com o banco de dados
-        conexao.commit()
+        # Tabela de regras por palavra-chave/regex, aplicadas antes do modelo de IA
+        print(" -> Criando tabela 'regras_padrao'...")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS regras_padrao (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                padrao TEXT NOT NULL,
+                tipo TEXT NOT NULL DEFAULT 'palavra',
+                codigo INTEGER NOT NULL,
+                prioridade INTEGER NOT NULL DEFAULT 100,
+                ativo INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+        if cursor.execute("SELECT COUNT(*) FROM regras_padrao").fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO regras_padrao (padrao, tipo, codigo, prioridade, ativo) VALUES (?, ?, ?, ?, ?)",
+                REGRAS_PADRAO_INICIAIS
+            )
+
+        cursor.execute("COMMIT")
+
+    except (OSError, ValueError, UnicodeDecodeError, pd.errors.ParserError, sqlite3.Error) as e:
+        if conexao.in_transaction:
+            cursor.execute("ROLLBACK")
+        conexao.execute(f"PRAGMA journal_mode = {journal_mode_anterior}")
         conexao.close()
+        print(f"ERRO CRÍTICO durante a migração (nenhuma tabela foi alterada): {e}")
+        return
+
+    duracao = time.perf_counter() - inicio
+    conexao.execute("PRAGMA optimize")
+    conexao.execute(f"PRAGMA journal_mode = {journal_mode_anterior}")
+    conexao.close()
 
-        print(f"\n✅ SUCESSO! O banco de dados '{NOME_BANCO_DE_DADOS}' foi criado e populado com os dados.")
-        print("   As tabelas 'plano_de_contas', 'base_de_treinamento' e 'transacoes_classificadas' foram criadas.")
+    total_linhas = sum(linhas_por_tabela.values())
+    print(f"\n✅ SUCESSO! O banco de dados '{caminho_banco_de_dados}' foi criado e populado com os dados.")
+    print("   As tabelas 'plano_de_contas', 'base_de_treinamento', 'transacoes_classificadas' e 'regras_padrao' foram criadas.")
+    print(f"   Carga: {total_linhas} linhas em {duracao:.2f}s "
+          f"({total_linhas / max(duracao, 1e-9):,.0f} linhas/s, {bytes_lidos / 1e6 / max(duracao, 1e-9):.1f} MB/s).")
 
-    except Exception as e:
-        print(f"ERRO CRÍTICO durante a operação com o banco de dados: {e}")
 
 if __name__ == "__main__":
     migrar_csv_para_sqlite()
\ No newline at end of file
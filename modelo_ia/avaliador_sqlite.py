@@ -0,0 +1,280 @@
+import pandas as pd
+import numpy as np
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+# --- 1. CONFIGURAÇÕES ---
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
+NOME_BANCO_DE_DADOS = REPO_ROOT / 'contaflow.db'
+NOME_BANCO_DE_DADOS_ALTERNATIVO = REPO_ROOT / 'base_de_conhecimento' / 'contaflow.db'
+NOME_MODELO_IA = BASE_DIR / 'modelo_classificador_avancado.pkl'
+
+# Quantidade de linhas lidas por vez do banco (mantém a memória estável em milhões de linhas)
+TAMANHO_LOTE = 100_000
+
+# Número de faixas usadas na curva de calibração da 'confianca'
+FAIXAS_CALIBRACAO = 10
+
+# Mesmo padrão de tokens usado pelo TfidfVectorizer do modelo
+PADRAO_TOKEN = r'(?u)\b\w\w+\b'
+
+# Expressões SQL reaproveitadas nas consultas
+# A coluna 'data' guarda o texto do CSV do cliente: só dd/mm/aaaa e aaaa-mm-dd (com ou sem hora)
+# viram mês; o resto cai no balde 'desconhecido' em vez de gerar chaves sem sentido.
+MES_DESCONHECIDO = 'desconhecido'
+SQL_MES = (
+    "CASE WHEN data GLOB '[0-3][0-9]/[01][0-9]/[0-9][0-9][0-9][0-9]*' "
+    "THEN substr(data, 7, 4) || '-' || substr(data, 4, 2) "
+    "WHEN data GLOB '[0-9][0-9][0-9][0-9]-[01][0-9]-[0-3][0-9]*' THEN substr(data, 1, 7) "
+    f"ELSE '{MES_DESCONHECIDO}' END"
+)
+SQL_FAMILIA_METODO = (
+    "CASE WHEN metodo LIKE 'Regra%' THEN 'Regra' "
+    "WHEN metodo LIKE 'IA%' THEN 'IA' ELSE 'Outro' END"
+)
+
+
+def sql_codigo_inteiro(coluna):
+    """
+    Expressão SQL que devolve a coluna de código como INTEGER (ou NULL para 'Falha').
+    Versões antigas do classificador gravaram numpy.int64 como BLOB de 8 bytes
+    little-endian; os 4 bytes baixos são decodificados a partir do hex() no próprio SQLite.
+    """
+    hexa = f"hex({coluna})"
+    bytes_baixos = ' + '.join(
+        f"((instr('0123456789ABCDEF', substr({hexa}, {2 * i + 1}, 1)) - 1) * 16"
+        f" + instr('0123456789ABCDEF', substr({hexa}, {2 * i + 2}, 1)) - 1) * {256 ** i}"
+        for i in range(4)
+    )
+    return (
+        f"CASE typeof({coluna}) "
+        f"WHEN 'integer' THEN {coluna} "
+        f"WHEN 'real' THEN CAST({coluna} AS INTEGER) "
+        f"WHEN 'text' THEN CASE WHEN {coluna} GLOB '[0-9]*' AND {coluna} NOT GLOB '*[^0-9]*' "
+        f"THEN CAST({coluna} AS INTEGER) END "
+        f"WHEN 'blob' THEN CASE WHEN length({coluna}) = 8 AND substr({hexa}, 9) = '00000000' "
+        f"THEN {bytes_baixos} END "
+        f"END"
+    )
+
+
+def normalizar_textos(serie):
+    """
+    Versão vetorizada do normalizar_texto() dos outros scripts: remove acentos via NFKD
+    (equivalente ao unidecode para o português), passa para minúsculas e tira espaços.
+    """
+    return (serie.fillna('').astype(str).str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii').str.lower().str.strip())
+
+
+def garantir_tabelas_de_avaliacao(conexao):
+    """Cria a coluna de curadoria e a tabela de snapshots, caso ainda não existam."""
+    colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(transacoes_classificadas)")}
+    if 'codigo_correto' not in colunas:
+        conexao.execute("ALTER TABLE transacoes_classificadas ADD COLUMN codigo_correto INTEGER")
+
+    conexao.execute('''
+        CREATE TABLE IF NOT EXISTS avaliacoes_modelo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            execucao TEXT,
+            metrica TEXT,
+            chave TEXT,
+            valor REAL,
+            amostras INTEGER,
+            data_avaliacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_avaliacoes_metrica ON avaliacoes_modelo (metrica, chave)")
+    conexao.commit()
+
+
+def calcular_metricas_revisadas(conexao):
+    """
+    Acurácia, F1 por classe e calibração da 'confianca' sobre as linhas revisadas.
+    O gabarito é 'codigo_correto' quando preenchido; caso contrário, a linha revisada
+    confirma o próprio 'codigo_classificado'.
+    """
+    consulta = f'''
+        SELECT {SQL_FAMILIA_METODO} AS familia,
+               {sql_codigo_inteiro('codigo_classificado')} AS previsto,
+               COALESCE({sql_codigo_inteiro('codigo_correto')},
+                        {sql_codigo_inteiro('codigo_classificado')}) AS real,
+               confianca
+        FROM transacoes_classificadas
+        WHERE status <> 'para_verificar'
+    '''
+
+    lotes_pares = []
+    lotes_familia = []
+    faixas = np.arange(FAIXAS_CALIBRACAO)
+    soma_confianca = np.zeros(FAIXAS_CALIBRACAO)
+    soma_acertos = np.zeros(FAIXAS_CALIBRACAO)
+    amostras_faixa = np.zeros(FAIXAS_CALIBRACAO, dtype='int64')
+
+    for lote in pd.read_sql_query(consulta, conexao, chunksize=TAMANHO_LOTE):
+        lote['previsto'] = lote['previsto'].astype('Int64')
+        lote['real'] = lote['real'].astype('Int64')
+        lote = lote.dropna(subset=['real'])
+        acerto = (lote['previsto'] == lote['real']).fillna(False).astype('int64')
+
+        lotes_pares.append(lote.groupby(['real', 'previsto'], dropna=False).size())
+        lotes_familia.append(acerto.groupby(lote['familia']).agg(['sum', 'size']))
+
+        confianca = lote['confianca'].fillna(0.0).clip(0.0, 1.0).to_numpy()
+        faixa = np.minimum((confianca * FAIXAS_CALIBRACAO).astype('int64'), FAIXAS_CALIBRACAO - 1)
+        soma_confianca += np.bincount(faixa, weights=confianca, minlength=FAIXAS_CALIBRACAO)
+        soma_acertos += np.bincount(faixa, weights=acerto.to_numpy(), minlength=FAIXAS_CALIBRACAO)
+        amostras_faixa += np.bincount(faixa, minlength=FAIXAS_CALIBRACAO)
+
+    metricas = []
+    total = int(amostras_faixa.sum())
+    if total == 0:
+        print(" -> Nenhuma transação revisada encontrada; acurácia, F1 e calibração não foram calculadas.")
+        return metricas
+
+    # Combina os agregados parciais de cada lote
+    contagem_pares = pd.concat(lotes_pares).groupby(level=[0, 1], dropna=False).sum()
+    acertos_por_familia = pd.concat(lotes_familia).groupby(level=0).sum()
+    acertos_por_familia.columns = ['acertos', 'amostras']
+
+    # --- Acurácia geral e por família de método ---
+    acertos_totais = int(acertos_por_familia['acertos'].sum())
+    metricas.append(('acuracia', 'geral', acertos_totais / total, total))
+    for familia, linha in acertos_por_familia.iterrows():
+        metricas.append(('acuracia', familia, linha['acertos'] / linha['amostras'], int(linha['amostras'])))
+
+    # --- F1 por classe, a partir da matriz de confusão esparsa ---
+    pares = contagem_pares.reset_index()
+    pares.columns = ['real', 'previsto', 'quantidade']
+    verdadeiros = pares[(pares['real'] == pares['previsto']).fillna(False)].groupby('real')['quantidade'].sum()
+    suporte_real = pares.groupby('real')['quantidade'].sum()
+    suporte_previsto = pares.dropna(subset=['previsto']).groupby('previsto')['quantidade'].sum()
+    classes = suporte_real.index
+    verdadeiros = verdadeiros.reindex(classes, fill_value=0)
+    denominador = suporte_real + suporte_previsto.reindex(classes, fill_value=0)
+    f1 = (2 * verdadeiros / denominador).fillna(0.0)
+    for classe, valor in f1.items():
+        metricas.append(('f1', str(classe), float(valor), int(suporte_real[classe])))
+    metricas.append(('f1_macro', 'geral', float(f1.mean()), total))
+
+    # --- Calibração: confiança média vs. acurácia em cada faixa ---
+    erro_calibracao = 0.0
+    for indice in faixas[amostras_faixa > 0]:
+        n = int(amostras_faixa[indice])
+        confianca_media = soma_confianca[indice] / n
+        acuracia_faixa = soma_acertos[indice] / n
+        erro_calibracao += n / total * abs(acuracia_faixa - confianca_media)
+        chave = f"{indice / FAIXAS_CALIBRACAO:.1f}-{(indice + 1) / FAIXAS_CALIBRACAO:.1f}"
+        metricas.append(('calibracao_confianca', chave, float(confianca_media), n))
+        metricas.append(('calibracao_acuracia', chave, float(acuracia_faixa), n))
+    metricas.append(('erro_calibracao_esperado', 'geral', float(erro_calibracao), total))
+
+    print(f" -> {total} transações revisadas avaliadas: acurácia {acertos_totais / total:.2%}, "
+          f"F1 macro {f1.mean():.3f}, ECE {erro_calibracao:.3f}.")
+    return metricas
+
+
+def avisar_mes_desconhecido(quantidade):
+    if quantidade:
+        print(f"Aviso: {quantidade} transação(ões) com 'data' fora de dd/mm/aaaa ou aaaa-mm-dd "
+              f"foram agrupadas no mês '{MES_DESCONHECIDO}'.")
+
+
+def calcular_participacao_por_mes(conexao):
+    """Participação mês a mês de Regra vs. IA, agregada inteiramente no SQLite."""
+    consulta = f'''
+        SELECT {SQL_MES} AS mes,
+               {SQL_FAMILIA_METODO} AS familia,
+               COUNT(*) AS quantidade
+        FROM transacoes_classificadas
+        GROUP BY mes, familia
+    '''
+    df = pd.read_sql_query(consulta, conexao)
+    if df.empty:
+        return []
+
+    avisar_mes_desconhecido(df.loc[df['mes'] == MES_DESCONHECIDO, 'quantidade'].sum())
+    df['total_mes'] = df.groupby('mes')['quantidade'].transform('sum')
+    df['participacao'] = df['quantidade'] / df['total_mes']
+    print(f" -> Participação Regra vs. IA calculada para {df['mes'].nunique()} mês(es).")
+    return [
+        (f"participacao_{familia.lower()}", mes, float(participacao), int(quantidade))
+        for mes, familia, quantidade, participacao in df[['mes', 'familia', 'quantidade', 'participacao']].itertuples(index=False)
+    ]
+
+
+def calcular_taxa_vocabulario_por_mes(conexao, modelo_ia):
+    """
+    Fração dos tokens das descrições que o vocabulário do modelo conhece, mês a mês.
+    Uma queda nessa taxa indica que os lançamentos novos se afastaram da base de treino.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vocabulario = modelo_ia.named_steps['vectorizer'].vocabulary_
+    unigramas = sorted(termo for termo in vocabulario if ' ' not in termo)
+    contador = CountVectorizer(vocabulary=unigramas, token_pattern=PADRAO_TOKEN)
+
+    consulta = f"SELECT {SQL_MES} AS mes, descricao_original FROM transacoes_classificadas"
+    conhecidos = pd.Series(dtype='float64')
+    totais = pd.Series(dtype='float64')
+    for lote in pd.read_sql_query(consulta, conexao, chunksize=TAMANHO_LOTE):
+        textos = normalizar_textos(lote['descricao_original'])
+        tokens_conhecidos = np.asarray(contador.transform(textos).sum(axis=1)).ravel()
+        tokens_totais = textos.str.count(PADRAO_TOKEN).to_numpy()
+        conhecidos = conhecidos.add(pd.Series(tokens_conhecidos).groupby(lote['mes']).sum(), fill_value=0)
+        totais = totais.add(pd.Series(tokens_totais).groupby(lote['mes']).sum(), fill_value=0)
+
+    taxa = (conhecidos / totais.where(totais > 0)).dropna()
+    print(f" -> Taxa de acerto do vocabulário calculada para {len(taxa)} mês(es).")
+    return [('taxa_vocabulario', mes, float(valor), int(totais[mes])) for mes, valor in taxa.items()]
+
+
+def avaliar_modelo_com_db():
+    """
+    Avalia o classificador sobre o histórico de 'transacoes_classificadas'
+    e grava um snapshot das métricas na tabela 'avaliacoes_modelo'.
+    """
+    print("--- INICIANDO AVALIAÇÃO E MONITORAMENTO DO MODELO (VERSÃO BANCO DE DADOS) ---")
+
+    caminho_db = NOME_BANCO_DE_DADOS if NOME_BANCO_DE_DADOS.exists() else NOME_BANCO_DE_DADOS_ALTERNATIVO
+    if not caminho_db.exists():
+        print(
+            "ERRO CRÍTICO: Banco de dados não encontrado nos caminhos esperados: "
+            f"'{NOME_BANCO_DE_DADOS}' ou '{NOME_BANCO_DE_DADOS_ALTERNATIVO}'."
+        )
+        return
+
+    conexao = sqlite3.connect(caminho_db)
+    try:
+        garantir_tabelas_de_avaliacao(conexao)
+
+        metricas = calcular_metricas_revisadas(conexao)
+        metricas += calcular_participacao_por_mes(conexao)
+
+        if NOME_MODELO_IA.exists():
+            import joblib
+            metricas += calcular_taxa_vocabulario_por_mes(conexao, joblib.load(NOME_MODELO_IA))
+        else:
+            print(f"Aviso: Modelo '{NOME_MODELO_IA}' não encontrado; taxa de vocabulário não calculada.")
+
+        # --- Salvando o snapshot no Banco de Dados ---
+        execucao = datetime.now().isoformat(timespec='seconds')
+        conexao.executemany(
+            "INSERT INTO avaliacoes_modelo (execucao, metrica, chave, valor, amostras) VALUES (?, ?, ?, ?, ?)",
+            [(execucao, metrica, chave, valor, amostras) for metrica, chave, valor, amostras in metricas]
+        )
+        conexao.commit()
+
+    except Exception as e:
+        print(f"ERRO CRÍTICO durante a avaliação: {e}")
+        return
+    finally:
+        conexao.close()
+
+    print(f"\n✅ SUCESSO! {len(metricas)} métricas salvas na tabela 'avaliacoes_modelo' (execução {execucao}).")
+
+
+if __name__ == "__main__":
+    avaliar_modelo_com_db()
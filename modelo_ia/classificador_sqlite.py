@@ -1,16 +1,25 @@
 import pandas as pd
 import sqlite3
 import os
-import joblib
+import re
 from unidecode import unidecode
-from datetime import datetime
 from pathlib import Path
 
 # --- 1. CONFIGURAÇÕES ---
+BASE_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BASE_DIR.parent
+CAMINHO_BANCO_DE_DADOS = REPO_ROOT / 'contaflow.db'
+CAMINHO_BANCO_DE_DADOS_ALTERNATIVO = REPO_ROOT / 'base_de_conhecimento' / 'contaflow.db'
+NOME_MODELO_IA = BASE_DIR / 'modelo_classificador_avancado.pkl'
+PASTA_ENTRADA = REPO_ROOT / 'arquivos_para_classificar'
+PASTA_SAIDA = REPO_ROOT / 'arquivos_classificados'
 
 # Nome do arquivo do cliente na pasta de entrada
 ARQUIVO_ENTRADA_NOME = 'Fluxo de caixa diversos.csv'
 
+# Método registrado para linhas resolvidas pela tabela 'regras_padrao'
+METODO_REGRA_PADRAO = 'Regra (Padrão)'
+
 
 def ler_csv_com_fallback(caminho_arquivo):
     """Lê um CSV tentando diferentes codificações e separadores."""
@@ -44,15 +53,96 @@ def limpar_e_converter_valor(valor):
         return 0.0
 
 
+def carregar_regras_padrao(conexao):
+    """Lê as regras ativas de 'regras_padrao', da maior para a menor prioridade."""
+    try:
+        return pd.read_sql_query(
+            "SELECT padrao, tipo, codigo FROM regras_padrao WHERE ativo = 1 ORDER BY prioridade DESC, id",
+            conexao
+        )
+    except pd.errors.DatabaseError:
+        print("Aviso: Tabela 'regras_padrao' não encontrada. Execute o migrador para criá-la.")
+        return pd.DataFrame(columns=['padrao', 'tipo', 'codigo'])
+
+
+def normalizar_texto_para_regras(texto):
+    """normalizar_texto() com espaços repetidos reduzidos a um, para casar extratos com campos preenchidos."""
+    return re.sub(r'\s+', ' ', normalizar_texto(texto))
+
+
+def compilar_regras_padrao(df_regras):
+    """
+    Prepara as regras para aplicação vetorizada. Retorna (regex_palavras, regras_regex):
+    - todas as palavras-chave entram em uma única alternação, varrida uma vez por descrição;
+    - cada regra do tipo 'regex' é compilada e aplicada sozinha, para que grupos e
+      retrovisores (\\1) escritos pelo usuário continuem valendo.
+    A posição da regra em df_regras (já ordenado por prioridade) é o seu ranking.
+    """
+    ranking_palavras = {}
+    regras_regex = []
+    for posicao, (padrao, tipo) in enumerate(zip(df_regras['padrao'], df_regras['tipo'])):
+        if tipo == 'regex':
+            try:
+                regras_regex.append((posicao, re.compile(padrao)))
+            except re.error as e:
+                print(f"Aviso: Regra '{padrao}' ignorada (regex inválida: {e}).")
+            continue
+        palavra = normalizar_texto_para_regras(padrao)
+        if palavra:
+            # Palavra repetida: fica a ocorrência de maior prioridade
+            ranking_palavras.setdefault(palavra, posicao)
+
+    regex_palavras = None
+    if ranking_palavras:
+        # Lookahead de largura zero: o finditer testa cada posição do texto, então palavras
+        # sobrepostas ('pix' e 'pix recebido') são todas encontradas na mesma varredura.
+        # Em uma mesma posição vence a primeira alternativa, por isso a ordem é a de prioridade.
+        # (?<!\w)/(?!\w) em vez de \b: palavras-chave que começam ou terminam em pontuação
+        # ('tar.', '(-) iof') também casam quando seguidas de espaço.
+        alternativas = '|'.join(re.escape(palavra) for palavra in ranking_palavras)
+        regex_palavras = re.compile(rf'(?=(?<!\w)({alternativas})(?!\w))')
+    return (regex_palavras, ranking_palavras), regras_regex
+
+
+def aplicar_regras_padrao(textos_normalizados, matcher, df_regras):
+    """Devolve, para cada texto, o código da regra de maior prioridade que casou (ou NaN)."""
+    (regex_palavras, ranking_palavras), regras_regex = matcher
+    candidatos = []
+
+    if regex_palavras is not None:
+        acertos = textos_normalizados.str.extractall(regex_palavras)[0]
+        candidatos.append(acertos.map(ranking_palavras).groupby(level=0).min())
+
+    for posicao, padrao in regras_regex:
+        casou = textos_normalizados.map(padrao.search).notna()
+        candidatos.append(pd.Series(posicao, index=textos_normalizados.index[casou]))
+
+    if not candidatos:
+        return pd.Series(None, index=textos_normalizados.index, dtype='object')
+
+    # Entre todas as regras que casaram, vence a de menor posição (maior prioridade)
+    regra_vencedora = pd.concat(candidatos).groupby(level=0).min()
+    codigos = df_regras['codigo'].reset_index(drop=True)
+    return regra_vencedora.map(codigos).reindex(textos_normalizados.index)
+
+
+def carregar_modelo_ia():
+    """
+    Carrega o modelo sob demanda. O joblib (e, ao despickar, o scikit-learn) só é
+    importado aqui, então arquivos resolvidos só por regras nunca pagam esse custo.
+    """
+    import joblib
+    modelo_ia = joblib.load(NOME_MODELO_IA)
+    print(" -> Modelo de IA carregado.")
+    return modelo_ia
+
+
 # --- 3. O SCRIPT PRINCIPAL ---
-def classificar_com_db():
+def classificar_com_db(arquivo_entrada_nome=ARQUIVO_ENTRADA_NOME):
     print("--- INICIANDO CLASSIFICADOR HÍBRIDO (VERSÃO BANCO DE DADOS) ---")
 
     try:
         # --- Conexão e Carregamento dos Ativos ---
-        modelo_ia = joblib.load(NOME_MODELO_IA)
-        print(" -> Modelo de IA carregado.")
-
         caminho_db = CAMINHO_BANCO_DE_DADOS if CAMINHO_BANCO_DE_DADOS.exists() else CAMINHO_BANCO_DE_DADOS_ALTERNATIVO
         if not caminho_db.exists():
             raise FileNotFoundError(
@@ -62,9 +152,10 @@ def classificar_com_db():
         conexao = sqlite3.connect(caminho_db)
 
         df_mestre = pd.read_sql_query("SELECT * FROM plano_de_contas", conexao)
+        df_regras_padrao = carregar_regras_padrao(conexao)
         print(" -> Base de conhecimento carregada do banco de dados.")
 
-        caminho_arquivo_entrada = PASTA_ENTRADA / ARQUIVO_ENTRADA_NOME
+        caminho_arquivo_entrada = PASTA_ENTRADA / arquivo_entrada_nome
         df_fluxo = ler_csv_com_fallback(caminho_arquivo_entrada)
 
     except Exception as e:
@@ -78,24 +169,31 @@ def classificar_com_db():
 
     mapa_regras = pd.Series(df_mestre.codigo.values, index=df_mestre['subgrupo'].apply(normalizar_texto)).to_dict()
     mapa_detalhes = df_mestre.drop_duplicates(subset=['codigo']).set_index('codigo').to_dict('index')
+    chave_dupla_mestre = df_mestre['grupo'].apply(normalizar_texto) + '|' + df_mestre['subgrupo'].apply(normalizar_texto)
+    mapa_regra_dupla = pd.Series(df_mestre.codigo.values, index=chave_dupla_mestre).to_dict()
 
     df_fluxo['valor'] = df_fluxo['valor'].apply(limpar_e_converter_valor)
     df_fluxo['Codigo'] = None
     df_fluxo['Metodo'] = ''
     df_fluxo['Confianca'] = 0.0
 
+    # Regras por palavra-chave/regex: um único matcher aplicado de uma vez sobre a coluna de descrição
+    matcher_padrao = compilar_regras_padrao(df_regras_padrao)
+    descricoes = df_fluxo['descricao'] if 'descricao' in df_fluxo.columns else pd.Series('', index=df_fluxo.index)
+    # Só o texto das regras tem os espaços colapsados; o modelo continua recebendo o texto de sempre
+    codigos_regra_padrao = aplicar_regras_padrao(
+        descricoes.map(normalizar_texto_para_regras), matcher_padrao, df_regras_padrao
+    )
+    print(f" -> {codigos_regra_padrao.notna().sum()} linha(s) atendida(s) pelas regras padrão.")
+
     print("\n -> Iniciando classificação Híbrida...")
     for index, row in df_fluxo.iterrows():
         codigo_encontrado = None
 
-        # Lógica de classificação hierárquica...
-        # ... (exatamente a mesma lógica de antes) ...
+        # Lógica de classificação hierárquica: as regras vêm antes do modelo
         grupo_cliente = row.get('grupo')
         subgrupo_cliente = row.get('subgrupo')
         if grupo_cliente and pd.notna(grupo_cliente) and subgrupo_cliente and pd.notna(subgrupo_cliente):
-            df_mestre['chave_dupla'] = df_mestre['grupo'].apply(normalizar_texto) + '|' + df_mestre['subgrupo'].apply(
-                normalizar_texto)
-            mapa_regra_dupla = pd.Series(df_mestre.codigo.values, index=df_mestre.chave_dupla).to_dict()
             chave_cliente = normalizar_texto(grupo_cliente) + '|' + normalizar_texto(subgrupo_cliente)
             codigo_encontrado = mapa_regra_dupla.get(chave_cliente)
             if codigo_encontrado:
@@ -108,16 +206,40 @@ def classificar_com_db():
                 df_fluxo.loc[index, 'Metodo'] = 'Regra (Subgrupo)'
                 df_fluxo.loc[index, 'Confianca'] = 1.0
 
-        if not codigo_encontrado:
-            texto_contexto = f"{row.get('grupo', '')} {row.get('subgrupo', '')} {row.get('descricao', '')}"
-            texto_normalizado = normalizar_texto(texto_contexto)
-            if texto_normalizado:
-                codigo_encontrado = modelo_ia.predict([texto_normalizado])[0]
-                probabilidade = modelo_ia.predict_proba([texto_normalizado]).max()
-                df_fluxo.loc[index, 'Metodo'] = 'IA (Contexto)'
-                df_fluxo.loc[index, 'Confianca'] = probabilidade
+        if not codigo_encontrado and pd.notna(codigos_regra_padrao[index]):
+            codigo_encontrado = int(codigos_regra_padrao[index])
+            df_fluxo.loc[index, 'Metodo'] = METODO_REGRA_PADRAO
+            df_fluxo.loc[index, 'Confianca'] = 1.0
+
+        if codigo_encontrado:
+            df_fluxo.loc[index, 'Codigo'] = codigo_encontrado
+
+    # --- IA: só as linhas que nenhuma regra resolveu, em uma única chamada ao modelo ---
+    pendentes = df_fluxo.index[df_fluxo['Codigo'].isna()]
+    colunas_contexto = [col for col in ['grupo', 'subgrupo', 'descricao'] if col in df_fluxo.columns]
+    textos_contexto = (
+        df_fluxo.loc[pendentes, colunas_contexto].fillna('').astype(str).agg(' '.join, axis=1).map(normalizar_texto)
+        if colunas_contexto else pd.Series('', index=pendentes)
+    )
+    textos_contexto = textos_contexto[textos_contexto != '']
+
+    if textos_contexto.empty:
+        print(" -> Modelo de IA não foi necessário: todas as linhas foram resolvidas por regras.")
+    else:
+        try:
+            modelo_ia = carregar_modelo_ia()
+        except Exception as e:
+            print(f"ERRO CRÍTICO no carregamento do modelo de IA: {e}")
+            conexao.close()
+            return
+        probabilidades = modelo_ia.predict_proba(textos_contexto.tolist())
+        # .tolist() devolve int nativo; numpy.int64 seria gravado como BLOB no SQLite
+        df_fluxo.loc[textos_contexto.index, 'Codigo'] = modelo_ia.classes_[probabilidades.argmax(axis=1)].tolist()
+        df_fluxo.loc[textos_contexto.index, 'Metodo'] = 'IA (Contexto)'
+        df_fluxo.loc[textos_contexto.index, 'Confianca'] = probabilidades.max(axis=1)
+        print(f" -> {len(textos_contexto)} linha(s) classificada(s) pelo modelo de IA.")
 
-        df_fluxo.loc[index, 'Codigo'] = codigo_encontrado if codigo_encontrado else 'Falha'
+    df_fluxo['Codigo'] = df_fluxo['Codigo'].where(df_fluxo['Codigo'].notna(), 'Falha')
 
     print(" -> Classificação concluída.")
 
@@ -130,7 +252,7 @@ def classificar_com_db():
 
     # --- SALVANDO OS RESULTADOS ---
     # 1. Salva o CSV para o cliente
-    caminho_arquivo_saida = PASTA_SAIDA / f"classificado_{ARQUIVO_ENTRADA_NOME}"
+    caminho_arquivo_saida = PASTA_SAIDA / f"classificado_{arquivo_entrada_nome}"
     colunas_finais_csv = ['Data', 'DescricaoOriginal', 'Valor', 'Débito', 'Crédito', 'GrupoClassificado',
                           'SubgrupoClassificado', 'Metodo', 'Confianca']
     df_resultado_csv = df_fluxo[[col for col in colunas_finais_csv if col in df_fluxo.columns]]
@@ -1,9 +1,5 @@
 import pandas as pd
 import sqlite3
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
 from unidecode import unidecode
 from pathlib import Path
 
@@ -33,6 +29,17 @@ def treinar_modelo_com_db():
     """
     print("--- INICIANDO TREINAMENTO AVANÇADO DO MODELO DE IA (VERSÃO BANCO DE DADOS) ---")
 
+    # O scikit-learn é pesado para importar; só é carregado quando o treino de fato acontece
+    try:
+        import joblib
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+    except ImportError as e:
+        print(f"ERRO: Biblioteca '{e.name}' não está instalada.")
+        print("Por favor, execute no seu terminal: pip install scikit-learn joblib")
+        return
+
     try:
         # Conecta-se ao banco de dados
         caminho_db = NOME_BANCO_DE_DADOS if NOME_BANCO_DE_DADOS.exists() else NOME_BANCO_DE_DADOS_ALTERNATIVO
@@ -89,12 +96,4 @@ def treinar_modelo_com_db():
 
 
 if __name__ == "__main__":
-    # Verifica se as bibliotecas necessárias estão instaladas
-    try:
-        import sklearn
-        from unidecode import unidecode
-    except ImportError as e:
-        print(f"ERRO: Biblioteca '{e.name}' não está instalada.")
-        print("Por favor, execute no seu terminal: pip install scikit-learn unidecode")
-    else:
-        treinar_modelo_com_db()
\ No newline at end of file
+    treinar_modelo_com_db()
\ No newline at end of file